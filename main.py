@@ -2,207 +2,243 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import atexit
+import functools
 import os
 import subprocess
 import tempfile
 import sys
-import zlib
-from typing import List, Dict, Set, Optional
-from datetime import datetime
-
-def read_git_object(git_dir: str, sha: str) -> bytes:
-    object_dir = os.path.join(git_dir, 'objects', sha[:2])
-    object_file = os.path.join(object_dir, sha[2:])
-    if not os.path.isfile(object_file):
+from collections import deque
+from typing import List, Dict, Set, Optional, Tuple
+
+PIPELINE_WINDOW = 64
+
+_cat_file_processes: Dict[Tuple[str, str], subprocess.Popen] = {}
+_commit_info_cache: Dict[Tuple[str, str], Dict[str, Optional[str]]] = {}
+
+def get_cat_file_process(git_dir: str, mode: str) -> subprocess.Popen:
+    key = (git_dir, mode)
+    process = _cat_file_processes.get(key)
+    if process is None or process.poll() is not None:
+        try:
+            process = subprocess.Popen(
+                ['git', '--git-dir', git_dir, 'cat-file', mode],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE
+            )
+        except OSError as e:
+            raise RuntimeError(f"Не удалось запустить git: {e}")
+        _cat_file_processes[key] = process
+    return process
+
+def close_process_pipes(process: subprocess.Popen):
+    try:
+        process.stdin.close()
+    except OSError:
+        # Процесс уже завершился, и неотправленные запросы дописать некуда
+        pass
+    process.stdout.close()
+
+def close_cat_file_processes():
+    for process in _cat_file_processes.values():
+        close_process_pipes(process)
+        process.wait()
+    _cat_file_processes.clear()
+
+atexit.register(close_cat_file_processes)
+
+def discard_cat_file_process(git_dir: str, mode: str):
+    process = _cat_file_processes.pop((git_dir, mode), None)
+    if process is not None:
+        process.kill()
+        process.wait()
+        close_process_pipes(process)
+
+def write_git_object_request(process: subprocess.Popen, sha: str):
+    try:
+        process.stdin.write(sha.encode('utf-8') + b'\n')
+    except OSError as e:
+        raise RuntimeError(f"Не удалось отправить запрос объекта {sha} процессу git cat-file: {e}")
+
+def flush_git_object_requests(process: subprocess.Popen):
+    try:
+        process.stdin.flush()
+    except OSError as e:
+        raise RuntimeError(f"Не удалось отправить запросы процессу git cat-file: {e}")
+
+def read_git_object_header(process: subprocess.Popen, sha: str) -> List[bytes]:
+    header = process.stdout.readline()
+    if not header:
+        raise RuntimeError(f"Процесс git cat-file завершился при чтении объекта {sha}.")
+    fields = header.split()
+    if len(fields) != 3:
         raise RuntimeError(f"Объект {sha} не найден.")
-    with open(object_file, 'rb') as f:
-        compressed_data = f.read()
+    return fields
+
+def read_git_object_response(process: subprocess.Popen, sha: str) -> Tuple[str, int, bytes]:
+    _, type_, size = read_git_object_header(process, sha)
+    size = int(size)
+    data = process.stdout.read(size + 1)
+    if len(data) != size + 1:
+        raise RuntimeError(f"Не удалось прочитать объект {sha}.")
+    return type_.decode('utf-8'), size, data[:-1]
+
+def read_git_object(git_dir: str, sha: str) -> Tuple[str, int, bytes]:
+    process = get_cat_file_process(git_dir, '--batch')
+    write_git_object_request(process, sha)
+    flush_git_object_requests(process)
+    return read_git_object_response(process, sha)
+
+def resolve_git_ref(git_dir: str, ref: str) -> str:
+    process = get_cat_file_process(git_dir, '--batch-check')
+    write_git_object_request(process, ref)
+    flush_git_object_requests(process)
     try:
-        decompressed_data = zlib.decompress(compressed_data)
-    except zlib.error as e:
-        raise RuntimeError(f"Не удалось разархивировать объект {sha}: {e}")
-    return decompressed_data
-
-def parse_git_object(data: bytes) -> (str, str, bytes):
-    null_byte_index = data.find(b'\x00')
-    if null_byte_index == -1:
-        raise RuntimeError("Некорректный формат объекта Git.")
-    header = data[:null_byte_index].decode('utf-8')
-    type_, size = header.split(' ')
-    content = data[null_byte_index + 1:]
-    return type_, size, content
+        sha, _, _ = read_git_object_header(process, ref)
+    except RuntimeError:
+        raise RuntimeError(f"Ссылка {ref} не найдена.")
+    return sha.decode('utf-8')
 
-def get_commit_info(git_dir: str, commit_sha: str) -> Dict[str, Optional[str]]:
-    data = read_git_object(git_dir, commit_sha)
-    type_, size, content = parse_git_object(data)
+def parse_commit_info(commit_sha: str, type_: str, content: bytes) -> Dict[str, Optional[str]]:
     if type_ != 'commit':
         raise RuntimeError(f"Объект {commit_sha} не является коммитом.")
-    lines = content.decode('utf-8', errors='replace').splitlines()
+    # Нужны только строки заголовка до первой пустой строки; сообщение коммита не декодируется
+    header_end = content.find(b'\n\n')
+    header = content if header_end == -1 else content[:header_end]
     commit_info = {
         'hash': commit_sha,
+        'tree': None,
         'parent': [],
-        'author': None,
-        'date': None
+        'author': None
     }
-    for line in lines:
-        if line.startswith('parent '):
-            parent_hash = line.split(' ')[1]
+    for line in header.split(b'\n'):
+        if line.startswith(b'tree '):
+            commit_info['tree'] = line[5:].decode('ascii')
+        elif line.startswith(b'parent '):
+            parent_hash = line[7:].decode('ascii')
             commit_info['parent'].append(parent_hash)
-        elif line.startswith('author '):
-            parts = line.split(' ', 2)
+        elif line.startswith(b'author '):
+            parts = line.split(b' ', 2)
             if len(parts) >= 3:
                 author_info = parts[2]
-                author_parts = author_info.rsplit(' ', 2)
+                author_parts = author_info.rsplit(b' ', 2)
                 if len(author_parts) >= 3:
-                    commit_info['author'] = author_parts[0]
-                    timestamp = author_parts[1]
-                    commit_info['date'] = datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
+                    commit_info['author'] = author_parts[0].decode('utf-8', errors='replace')
+    return commit_info
+
+def get_commit_info(git_dir: str, commit_sha: str) -> Dict[str, Optional[str]]:
+    key = (git_dir, commit_sha)
+    commit_info = _commit_info_cache.get(key)
+    if commit_info is None:
+        type_, size, content = read_git_object(git_dir, commit_sha)
+        commit_info = parse_commit_info(commit_sha, type_, content)
+        _commit_info_cache[key] = commit_info
     return commit_info
 
 def get_commit_history(repo_path: str) -> List[str]:
     git_dir = os.path.join(repo_path, '.git')
     if not os.path.isdir(git_dir):
         raise RuntimeError(f"Путь {git_dir} не является git-репозиторием.")
-    head_path = os.path.join(git_dir, 'HEAD')
-    if not os.path.isfile(head_path):
-        raise RuntimeError("Файл HEAD не найден в репозитории.")
-    with open(head_path, 'r') as f:
-        head_content = f.read().strip()
-    if head_content.startswith('ref:'):
-        ref_path = head_content.split(' ')[1]
-        current_ref = os.path.join(git_dir, ref_path.replace('/', os.sep))
-        if not os.path.isfile(current_ref):
-            raise RuntimeError(f"Ссылка {ref_path} не найдена.")
-        with open(current_ref, 'r') as f:
-            current_commit = f.read().strip()
-    else:
-        current_commit = head_content
+    current_commit = resolve_git_ref(git_dir, 'HEAD')
+    process = get_cat_file_process(git_dir, '--batch')
     commits = []
-    visited = set()
-    stack = [current_commit]
-    while stack:
-        commit_sha = stack.pop()
-        if commit_sha in visited:
-            continue
-        visited.add(commit_sha)
+    # Коммит отмечается при постановке в очередь, поэтому каждый попадает в неё ровно один раз
+    visited = {current_commit}
+    queue = deque([current_commit])
+    # Запросы к git cat-file отправляются пачкой до PIPELINE_WINDOW штук, не дожидаясь ответов,
+    # чтобы git распаковывал следующие объекты, пока разбирается текущий
+    in_flight = deque()
+    while queue or in_flight:
+        try:
+            while queue and len(in_flight) < PIPELINE_WINDOW:
+                commit_sha = queue.popleft()
+                write_git_object_request(process, commit_sha)
+                in_flight.append(commit_sha)
+            flush_git_object_requests(process)
+            commit_sha = in_flight.popleft()
+            type_, size, content = read_git_object_response(process, commit_sha)
+            commit_info = parse_commit_info(commit_sha, type_, content)
+        except RuntimeError:
+            # Непрочитанные ответы или запросы остались в канале, процесс больше нельзя использовать
+            discard_cat_file_process(git_dir, '--batch')
+            raise
+        _commit_info_cache[(git_dir, commit_sha)] = commit_info
         commits.append(commit_sha)
-        commit_info = get_commit_info(git_dir, commit_sha)
-        parents = commit_info.get('parent', [])
-        for parent in parents:
+        for parent in commit_info['parent']:
             if parent and parent not in visited:
-                stack.append(parent)
+                visited.add(parent)
+                queue.append(parent)
     return commits
 
-def read_tree(git_dir: str, tree_sha: str) -> Dict[str, str]:
-    tree_data = read_git_object(git_dir, tree_sha)
-    type_, size, content = parse_git_object(tree_data)
+@functools.lru_cache(maxsize=None)
+def read_tree(git_dir: str, tree_sha: str) -> Tuple[Tuple[str, str, str], ...]:
+    type_, size, content = read_git_object(git_dir, tree_sha)
     if type_ != 'tree':
         raise RuntimeError(f"Объект {tree_sha} не является деревом.")
-    entries = {}
+    entries = []
+    content_find = content.find
+    content_len = len(content)
     i = 0
-    while i < len(content):
-        space_index = content.find(b' ', i)
+    while i < content_len:
+        space_index = content_find(b' ', i)
         if space_index == -1:
             break
         mode = content[i:space_index].decode('utf-8')
         i = space_index + 1
-        null_index = content.find(b'\x00', i)
+        null_index = content_find(b'\x00', i)
         if null_index == -1:
             break
         name = content[i:null_index].decode('utf-8')
-        i = null_index + 1
-        hash_bytes = content[i:i+20]
-        object_hash = ''.join(['{:02x}'.format(b) for b in hash_bytes])
-        i += 20
-        entries[name] = object_hash
-    return entries
-
-def diff_trees(parent_tree: Dict[str, str], current_tree: Dict[str, str]) -> List[str]:
-    changed_files = []
-    all_keys = set(parent_tree.keys()).union(set(current_tree.keys()))
-    for key in all_keys:
-        parent_hash = parent_tree.get(key)
-        current_hash = current_tree.get(key)
-        if parent_hash != current_hash:
-            changed_files.append(key)
-    return changed_files
+        i = null_index + 21
+        entries.append((name, mode, content[null_index + 1:i].hex()))
+    return tuple(entries)
 
-def get_commit_changes(repo_path: str, commit_hash: str) -> List[str]:
-    git_dir = os.path.join(repo_path, '.git')
-    if not os.path.isdir(git_dir):
-        raise RuntimeError(f"Путь {git_dir} не является git-репозиторием.")
-    current_commit_obj = read_git_object(git_dir, commit_hash)
-    type_, size, content = parse_git_object(current_commit_obj)
-    if type_ != 'commit':
-        raise RuntimeError(f"Объект {commit_hash} не является коммитом.")
-    lines = content.decode('utf-8', errors='replace').splitlines()
-    tree_hash = None
-    parents = []
-    for line in lines:
-        if line.startswith('tree '):
-            tree_hash = line.split(' ')[1]
-        elif line.startswith('parent '):
-            parent_hash = line.split(' ')[1]
-            parents.append(parent_hash)
-        elif line == '':
-            break
-    if not tree_hash:
-        raise RuntimeError(f"Не удалось найти дерево в коммите {commit_hash}.")
-    if parents:
-        parent_commit = parents[0]
-        parent_commit_obj = read_git_object(git_dir, parent_commit)
-        type_p, size_p, content_p = parse_git_object(parent_commit_obj)
-        if type_p != 'commit':
-            raise RuntimeError(f"Объект {parent_commit} не является коммитом.")
-        lines_p = content_p.decode('utf-8', errors='replace').splitlines()
-        tree_hash_p = None
-        for line in lines_p:
-            if line.startswith('tree '):
-                tree_hash_p = line.split(' ')[1]
-            elif line == '':
-                break
-        if not tree_hash_p:
-            raise RuntimeError(f"Не удалось найти дерево в родительском коммите {parent_commit}.")
-        parent_tree = read_tree(git_dir, tree_hash_p)
+def diff_trees(parent_tree: Tuple[Tuple[str, str, str], ...], current_tree: Tuple[Tuple[str, str, str], ...]) -> List[str]:
+    # Имя попадает в симметрическую разность записей, если запись добавлена, удалена
+    # или изменилось её содержимое либо режим (например, появился бит исполнения)
+    changed_entries = set(parent_tree).symmetric_difference(current_tree)
+    return list({name for name, _, _ in changed_entries})
+
+def get_commit_changes(git_dir: str, commit_info: Dict, parent_info: Optional[Dict]) -> List[str]:
+    if not commit_info['tree']:
+        raise RuntimeError(f"Не удалось найти дерево в коммите {commit_info['hash']}.")
+    if parent_info:
+        if not parent_info['tree']:
+            raise RuntimeError(f"Не удалось найти дерево в родительском коммите {parent_info['hash']}.")
+        parent_tree = read_tree(git_dir, parent_info['tree'])
     else:
-        parent_tree = {}
-    current_tree = read_tree(git_dir, tree_hash)
+        parent_tree = ()
+    current_tree = read_tree(git_dir, commit_info['tree'])
     changed_files = diff_trees(parent_tree, current_tree)
     return changed_files
 
 def get_all_files_and_dirs(repo_path: str, commit_hash: str) -> (Set[str], Set[str]):
     git_dir = os.path.join(repo_path, '.git')
-    current_commit_obj = read_git_object(git_dir, commit_hash)
-    type_, size, content = parse_git_object(current_commit_obj)
-    if type_ != 'commit':
-        raise RuntimeError(f"Объект {commit_hash} не является коммитом.")
-    lines = content.decode('utf-8', errors='replace').splitlines()
-    tree_hash = None
-    for line in lines:
-        if line.startswith('tree '):
-            tree_hash = line.split(' ')[1]
-        elif line == '':
-            break
+    tree_hash = get_commit_info(git_dir, commit_hash)['tree']
     if not tree_hash:
         raise RuntimeError(f"Не удалось найти дерево в коммите {commit_hash}.")
+    # -t выводит и сами поддеревья, поэтому директории берутся из вывода, а не выводятся из путей
+    try:
+        result = subprocess.run(
+            ['git', '--git-dir', git_dir, 'ls-tree', '-r', '-t', '-z', tree_hash],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+    except OSError as e:
+        raise RuntimeError(f"Не удалось запустить git: {e}")
+    if result.returncode != 0:
+        raise RuntimeError(f"Не удалось получить список файлов дерева {tree_hash}: {result.stderr.decode('utf-8', errors='replace')}")
     files = set()
     dirs = set()
-    def traverse_tree(t_hash, prefix=""):
-        t_data = read_tree(git_dir, t_hash)
-        for name, obj_hash in t_data.items():
-            obj_data = read_git_object(git_dir, obj_hash)
-            t_, s_, c_ = parse_git_object(obj_data)
-            path = name if prefix == "" else prefix + "/" + name
-            if t_ == 'tree':
-                dirs.add(path)
-                traverse_tree(obj_hash, path)
-            else:
-                files.add(path)
-                parts = path.split('/')
-                for i in range(1, len(parts)):
-                    d = '/'.join(parts[:i])
-                    dirs.add(d)
-    traverse_tree(tree_hash)
+    for entry in result.stdout.split(b'\x00'):
+        if not entry:
+            continue
+        # <mode> SP <type> SP <sha> TAB <path>
+        info, path = entry.split(b'\t', 1)
+        if info.split(b' ', 2)[1] == b'tree':
+            dirs.add(path.decode('utf-8'))
+        else:
+            files.add(path.decode('utf-8'))
     return files, dirs
 
 def build_dependency_graph(commits: List[str], repo_path: str) -> Dict[str, Dict[str, List[str]]]:
@@ -212,92 +248,108 @@ def build_dependency_graph(commits: List[str], repo_path: str) -> Dict[str, Dict
         "dirs": set()
     }
 
+    git_dir = os.path.join(repo_path, '.git')
+    files_add = graph_data["files"].add
+    dirs_add = graph_data["dirs"].add
+
+    # get_commit_info и read_tree кэшируются: каждый коммит и каждое дерево разбираются один раз
     for commit in commits:
         try:
-            changed_files = get_commit_changes(repo_path, commit)
+            commit_info = get_commit_info(git_dir, commit)
+            parent_info = None
+            if commit_info['parent']:
+                parent_info = get_commit_info(git_dir, commit_info['parent'][0])
+            changed_files = get_commit_changes(git_dir, commit_info, parent_info)
         except RuntimeError as e:
             print(f"Предупреждение: {e}", file=sys.stderr)
             changed_files = []
         graph_data["commits"][commit] = {"files": changed_files}
         for f in changed_files:
-            graph_data["files"].add(f)
+            files_add(f)
             parts = f.split('/')
-            for i in range(1, len(parts)):
-                d = '/'.join(parts[:i])
-                graph_data["dirs"].add(d)
+            d = parts[0]
+            for part in parts[1:]:
+                dirs_add(d)
+                d += '/' + part
 
     if commits:
+        # ls-tree -r -t уже перечисляет все поддеревья, раскрывать префиксы путей не нужно
         all_files, all_dirs = get_all_files_and_dirs(repo_path, commits[0])
-        for f in all_files:
-            graph_data["files"].add(f)
-            parts = f.split('/')
-            for i in range(1, len(parts)):
-                d = '/'.join(parts[:i])
-                graph_data["dirs"].add(d)
-        for d in all_dirs:
-            graph_data["dirs"].add(d)
+        graph_data["files"].update(all_files)
+        graph_data["dirs"].update(all_dirs)
 
     return graph_data
 
-def parent_directory(path: str) -> Optional[str]:
+def add_parent_directories(parent_of: Dict[str, Optional[str]], path: str):
+    if path in parent_of:
+        return
     parts = path.split('/')
-    if len(parts) > 1:
-        return '/'.join(parts[:-1])
-    return None
-
-def generate_dot_file(graph_data: Dict[str, Dict[str, List[str]]], output_path: str):
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write("digraph dependencies {\n")
-        f.write("  rankdir=TB;\n")
-        f.write("  node [shape=rectangle, fontname=\"Helvetica\"];\n\n")
-
-        # Коммиты
-        for commit in graph_data["commits"].keys():
-            f.write(f"  \"{commit}\" [label=\"{commit[:7]}\" style=filled fillcolor=lightblue];\n")
-        f.write("\n")
-
-        # Директории
-        for directory in graph_data["dirs"]:
-            f.write(f"  \"{directory}\" [label=\"{directory}\" style=filled fillcolor=orange];\n")
-        f.write("\n")
-
-        # Файлы
-        for file_name in graph_data["files"]:
-            f.write(f"  \"{file_name}\" [label=\"{file_name}\" style=filled fillcolor=lightgreen];\n")
-        f.write("\n")
-
-        # Ребра коммит -> директория или файл (если файл в корне)
-        for commit, data in graph_data["commits"].items():
-            changed_files = data["files"]
-            for file_name in changed_files:
-                pdir = parent_directory(file_name)
-                if pdir:
-                    f.write(f"  \"{commit}\" -> \"{pdir}\";\n")
-                else:
-                    # Файл находится в корне, создаём связь напрямую с файлом
-                    f.write(f"  \"{commit}\" -> \"{file_name}\";\n")
-        f.write("\n")
-
-        # Ребра между директориями (родитель -> дочерняя директория)
-        for directory in graph_data["dirs"]:
-            pd = parent_directory(directory)
-            if pd:
-                f.write(f"  \"{pd}\" -> \"{directory}\";\n")
-        f.write("\n")
-
-        # Ребра директория -> файл
-        for file_name in graph_data["files"]:
-            pdir = parent_directory(file_name)
+    parent = None
+    d = parts[0]
+    for part in parts[1:]:
+        parent_of[d] = parent
+        parent = d
+        d += '/' + part
+    parent_of[path] = parent
+
+def generate_dot(graph_data: Dict[str, Dict[str, List[str]]]) -> str:
+    lines = [
+        "digraph dependencies {\n",
+        "  rankdir=TB;\n",
+        "  node [shape=rectangle, fontname=\"Helvetica\"];\n\n"
+    ]
+
+    # Коммиты; стиль задаётся атрибутами по умолчанию, а не у каждого узла
+    lines.append("  node [style=filled, fillcolor=lightblue];\n")
+    lines.extend(f"  \"{commit}\" [label=\"{commit[:7]}\"];\n" for commit in graph_data["commits"])
+    lines.append("\n")
+
+    # Файлы и директории обходятся по одному разу: в том же проходе, где объявляются узлы,
+    # вычисляется родительская директория каждого пути.
+    # Подпись совпадает с идентификатором узла, поэтому label не нужен
+    files = graph_data["files"]
+    parent_of = {}
+    file_lines = ["  node [fillcolor=lightgreen];\n"]
+    for file_name in files:
+        file_lines.append(f"  \"{file_name}\";\n")
+        add_parent_directories(parent_of, file_name)
+    dir_lines = ["  node [fillcolor=orange];\n"]
+    for directory in graph_data["dirs"]:
+        # Имя, которое одновременно является и файлом, объявляется только среди файлов
+        if directory not in files:
+            dir_lines.append(f"  \"{directory}\";\n")
+        add_parent_directories(parent_of, directory)
+    lines.extend(dir_lines)
+    lines.append("\n")
+    lines.extend(file_lines)
+    lines.append("\n")
+
+    # Ребра коммит -> директория или файл (если файл в корне)
+    commit_edges = set()
+    for commit, data in graph_data["commits"].items():
+        changed_files = data["files"]
+        for file_name in changed_files:
+            pdir = parent_of[file_name]
             if pdir:
-                f.write(f"  \"{pdir}\" -> \"{file_name}\";\n")
-        f.write("}\n")
+                commit_edges.add((commit, pdir))
+            else:
+                # Файл находится в корне, создаём связь напрямую с файлом
+                commit_edges.add((commit, file_name))
+    lines.extend(f"  \"{source}\" -> \"{target}\";\n" for source, target in sorted(commit_edges))
+    lines.append("\n")
+
+    # Ребра родитель -> дочерняя директория и директория -> файл
+    tree_edges = sorted((parent, path) for path, parent in parent_of.items() if parent)
+    lines.extend(f"  \"{source}\" -> \"{target}\";\n" for source, target in tree_edges)
+    lines.append("}\n")
+    return "".join(lines)
 
-def visualize_graph(graphviz_path: str, dot_file: str):
-    png_file = dot_file + ".png"
-    cmd = [graphviz_path, "-Tpng", dot_file, "-o", png_file]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+def visualize_graph(graphviz_path: str, dot_source: str, png_file: str):
+    # Описание графа передаётся dot через stdin, без промежуточного файла
+    cmd = [graphviz_path, "-Tpng", "-o", png_file]
+    result = subprocess.run(cmd, input=dot_source.encode('utf-8'), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     if result.returncode != 0:
-        raise RuntimeError(f"Не удалось визуализировать граф: {result.stderr}")
+        raise RuntimeError(f"Не удалось визуализировать граф: {result.stderr.decode('utf-8', errors='replace')}")
     try:
         if sys.platform.startswith('darwin'):
             subprocess.run(['open', png_file], check=True)
@@ -328,14 +380,14 @@ def main():
         print("В репозитории нет коммитов для анализа.", file=sys.stderr)
         sys.exit(1)
     graph_data = build_dependency_graph(commits, args.repo_path)
-    with tempfile.NamedTemporaryFile(suffix=".dot", delete=False) as tmp_file:
-        dot_path = tmp_file.name
+    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_file:
+        png_path = tmp_file.name
     try:
-        generate_dot_file(graph_data, dot_path)
-        visualize_graph(args.graphviz_path, dot_path)
-    finally:
-        if os.path.exists(dot_path):
-            os.remove(dot_path)
+        visualize_graph(args.graphviz_path, generate_dot(graph_data), png_path)
+    except Exception:
+        if os.path.exists(png_path):
+            os.remove(png_path)
+        raise
 
 if __name__ == "__main__":
     main()